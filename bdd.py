@@ -0,0 +1,107 @@
+import sys
+
+
+class NodeLimitExceeded(RuntimeError):
+    """Диаграмма превысила допустимое число узлов."""
+
+
+class BDD:
+    """
+    Упорядоченная сокращённая диаграмма двоичных решений (ROBDD).
+
+    Узлы - целые числа: 0 и 1 - терминальные FALSE и TRUE, остальные
+    хранятся в массивах level/low/high. Таблица уникальности гарантирует,
+    что равносильные функции представлены одним и тем же узлом, поэтому
+    сравнение функций сводится к сравнению чисел.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    # Уровень терминальных узлов - ниже любой переменной
+    _TERMINAL_LEVEL = sys.maxsize
+
+    def __init__(self, max_nodes=None):
+        self.level = [self._TERMINAL_LEVEL, self._TERMINAL_LEVEL]
+        self.low = [self.FALSE, self.TRUE]
+        self.high = [self.FALSE, self.TRUE]
+        self.max_nodes = max_nodes
+        self._unique = {}
+        self._ite_cache = {}
+
+    def __len__(self):
+        return len(self.level)
+
+    def node(self, level, low, high):
+        """Возвращает узел (level, low, high), не создавая дубликатов."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self._unique.get(key)
+        if u is None:
+            u = len(self.level)
+            if self.max_nodes is not None and u >= self.max_nodes:
+                raise NodeLimitExceeded(f"Превышено число узлов BDD: {self.max_nodes}")
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self._unique[key] = u
+        return u
+
+    def variable(self, level):
+        """Узел переменной с заданным номером в порядке переменных."""
+        return self.node(level, self.FALSE, self.TRUE)
+
+    def ite(self, f, g, h):
+        """
+        If-then-else: (f and g) or (not f and h), через разложение Шеннона.
+        Рекурсия развёрнута в явный стек, чтобы глубина не зависела
+        от числа переменных.
+        """
+        level, low, high = self.level, self.low, self.high
+        cache = self._ite_cache
+        results = []
+        stack = [(f, g, h, None)]
+        while stack:
+            f, g, h, top = stack.pop()
+            if top is not None:
+                # Оба кофактора вычислены: собираем узел
+                r_high = results.pop()
+                r_low = results.pop()
+                r = self.node(top, r_low, r_high)
+                cache[(f, g, h)] = r
+                results.append(r)
+                continue
+
+            # Терминальные случаи
+            if f == self.TRUE or g == h:
+                results.append(g)
+                continue
+            if f == self.FALSE:
+                results.append(h)
+                continue
+            if g == self.TRUE and h == self.FALSE:
+                results.append(f)
+                continue
+            r = cache.get((f, g, h))
+            if r is not None:
+                results.append(r)
+                continue
+
+            top = min(level[f], level[g], level[h])
+            f0, f1 = (low[f], high[f]) if level[f] == top else (f, f)
+            g0, g1 = (low[g], high[g]) if level[g] == top else (g, g)
+            h0, h1 = (low[h], high[h]) if level[h] == top else (h, h)
+            stack.append((f, g, h, top))
+            stack.append((f1, g1, h1, None))
+            stack.append((f0, g0, h0, None))
+        return results[0]
+
+    def negate(self, f):
+        return self.ite(f, self.FALSE, self.TRUE)
+
+    def conjoin(self, f, g):
+        return self.ite(f, g, self.FALSE)
+
+    def disjoin(self, f, g):
+        return self.ite(f, self.TRUE, g)
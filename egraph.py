@@ -0,0 +1,210 @@
+class Rewrite:
+    """
+    Правило переписывания lhs -> rhs.
+    Шаблон - строка "?имя" (переменная шаблона) или кортеж (операция, *аргументы);
+    у листовых операций аргумент - значение, а не шаблон.
+    """
+
+    __slots__ = ("name", "lhs", "rhs")
+
+    def __init__(self, name, lhs, rhs):
+        self.name = name
+        self.lhs = lhs
+        self.rhs = rhs
+
+
+class EGraph:
+    """
+    E-граф: классы эквивалентности выражений над системой непересекающихся
+    множеств. E-узел - кортеж (операция, *идентификаторы классов потомков),
+    у листовых операций - (операция, значение). Таблица hashcons хранит
+    каждый канонический e-узел один раз.
+    """
+
+    def __init__(self, leaf_ops):
+        self.leaf_ops = frozenset(leaf_ops)
+        self._parent = []
+        self.hashcons = {}
+        # Узлы классов хранятся в словарях как упорядоченные множества,
+        # чтобы обход и извлечение не зависели от рандомизации хешей
+        self.classes = {}
+        # Индекс e-узлов по операции для search(); сбрасывается при изменениях
+        self._by_op = None
+
+    def __len__(self):
+        return len(self.hashcons)
+
+    def find(self, cid):
+        parent = self._parent
+        root = cid
+        while parent[root] != root:
+            root = parent[root]
+        while parent[cid] != root:
+            parent[cid], cid = root, parent[cid]
+        return root
+
+    def canonicalize(self, enode):
+        if enode[0] in self.leaf_ops:
+            return enode
+        return (enode[0],) + tuple(self.find(child) for child in enode[1:])
+
+    def add(self, enode):
+        """Добавляет e-узел и возвращает идентификатор его класса."""
+        enode = self.canonicalize(enode)
+        cid = self.hashcons.get(enode)
+        if cid is not None:
+            return self.find(cid)
+        cid = len(self._parent)
+        self._by_op = None
+        self._parent.append(cid)
+        self.hashcons[enode] = cid
+        self.classes[cid] = {enode: None}
+        return cid
+
+    def union(self, a, b):
+        """Объединяет два класса; возвращает False, если они уже совпадали."""
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        # Корнем остаётся более старый класс
+        if b < a:
+            a, b = b, a
+        self._parent[b] = a
+        self.classes[a].update(self.classes.pop(b))
+        return True
+
+    def rebuild(self):
+        """
+        Восстанавливает конгруэнтность: e-узлы, ставшие одинаковыми после
+        объединений, сливают свои классы, пока таблица не стабилизируется.
+        """
+        while True:
+            hashcons = {}
+            merged = False
+            for enode, cid in self.hashcons.items():
+                enode = self.canonicalize(enode)
+                cid = self.find(cid)
+                other = hashcons.get(enode)
+                if other is not None and self.find(other) != cid:
+                    self.union(other, cid)
+                    merged = True
+                hashcons[enode] = self.find(cid)
+            self.hashcons = hashcons
+            self._by_op = None
+            if not merged:
+                break
+        classes = {}
+        for enode, cid in self.hashcons.items():
+            classes.setdefault(self.find(cid), {})[enode] = None
+        self.classes = classes
+
+    def match(self, pattern, cid, subst=None):
+        """Возвращает все подстановки, при которых шаблон совпадает с классом."""
+        subst = {} if subst is None else subst
+        cid = self.find(cid)
+        if isinstance(pattern, str):
+            bound = subst.get(pattern)
+            if bound is None:
+                return [dict(subst, **{pattern: cid})]
+            return [subst] if self.find(bound) == cid else []
+
+        op = pattern[0]
+        results = []
+        for enode in self.classes[cid]:
+            if enode[0] == op:
+                results.extend(self._match_enode(pattern, enode, subst))
+        return results
+
+    def _match_enode(self, pattern, enode, subst):
+        """Сопоставляет шаблон с e-узлом той же операции."""
+        if enode[0] in self.leaf_ops:
+            return [subst] if enode[1:] == pattern[1:] else []
+        substs = [subst]
+        for sub_pattern, child in zip(pattern[1:], enode[1:]):
+            substs = [s for prev in substs for s in self.match(sub_pattern, child, prev)]
+            if not substs:
+                break
+        return substs
+
+    def search(self, pattern):
+        """
+        Находит все вхождения шаблона: пары (класс, подстановка).
+        Корень шаблона сопоставляется только с e-узлами его операции.
+        """
+        by_op = self._by_op
+        if by_op is None:
+            by_op = self._by_op = {}
+            for enode, cid in self.hashcons.items():
+                by_op.setdefault(enode[0], []).append((enode, cid))
+        return [
+            (cid, subst)
+            for enode, cid in by_op.get(pattern[0], ())
+            for subst in self._match_enode(pattern, enode, {})
+        ]
+
+    def instantiate(self, pattern, subst):
+        """Добавляет в граф выражение по шаблону и подстановке."""
+        if isinstance(pattern, str):
+            return subst[pattern]
+        if pattern[0] in self.leaf_ops:
+            return self.add(pattern)
+        return self.add((pattern[0],) + tuple(self.instantiate(p, subst) for p in pattern[1:]))
+
+
+def saturate(egraph, rules, iter_limit=30, node_limit=10000):
+    """
+    Применяет правила, пока граф не перестанет меняться (насыщение),
+    но не дольше iter_limit итераций и не больше node_limit e-узлов.
+    Возвращает True, если насыщение достигнуто.
+    """
+    for _ in range(iter_limit):
+        matches = [(rule, cid, subst) for rule in rules for cid, subst in egraph.search(rule.lhs)]
+        changed = False
+        for rule, cid, subst in matches:
+            if egraph.union(cid, egraph.instantiate(rule.rhs, subst)):
+                changed = True
+            if len(egraph) > node_limit:
+                egraph.rebuild()
+                return False
+        egraph.rebuild()
+        if not changed:
+            return True
+    return False
+
+
+def node_count(enode, child_costs):
+    """Стоимость e-узла - число узлов в выражении."""
+    return 1 + sum(child_costs)
+
+
+def extract(egraph, root, cost_fn=node_count):
+    """
+    Извлекает из класса root выражение минимальной стоимости в виде
+    вложенных кортежей (операция, *потомки). При равной стоимости
+    выбирается e-узел, добавленный раньше.
+    """
+    best = {}
+    changed = True
+    while changed:
+        changed = False
+        for cid, enodes in egraph.classes.items():
+            for enode in enodes:
+                if enode[0] in egraph.leaf_ops:
+                    cost = cost_fn(enode, ())
+                else:
+                    children = [egraph.find(child) for child in enode[1:]]
+                    if any(child not in best for child in children):
+                        continue
+                    cost = cost_fn(enode, [best[child][0] for child in children])
+                if cid not in best or cost < best[cid][0]:
+                    best[cid] = (cost, enode)
+                    changed = True
+
+    def build(cid):
+        enode = best[egraph.find(cid)][1]
+        if enode[0] in egraph.leaf_ops:
+            return enode
+        return (enode[0],) + tuple(build(child) for child in enode[1:])
+
+    return build(root)
@@ -1,272 +1,939 @@
+import weakref
+from dataclasses import dataclass, fields
+
+from bdd import BDD, NodeLimitExceeded
+from egraph import EGraph, Rewrite, extract, saturate
+
+# Целочисленные теги типов узлов: сравнение тегов дешевле isinstance
+TAG_VAR = 0
+TAG_CONST = 1
+TAG_NOT = 2
+TAG_AND = 3
+TAG_OR = 4
+
+# Число операндов узла, индексируется тегом
+_ARITY = (0, 0, 1, 2, 2)
+
+
 class LogicExpression:
     """Базовый класс для логических выражений."""
 
+    TAG = None
+
+    # _hash - структурный хеш, _str_cache - строка, однажды запрошенная
+    # через str() у этого узла; узлы заморожены, поэтому оба значения
+    # не устаревают и записываются через object.__setattr__.
+    # __weakref__ нужен таблице хеш-консинга.
+    __slots__ = ("_hash", "_str_cache", "__weakref__")
+
     def simplify(self):
         """Упрощает выражение."""
-        return self
+        return _simplify(self, {})
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.__dict__ == other.__dict__
+    def __hash__(self):
+        return self._hash
 
-    def __str__(self):
-        return self._str()
+    def __reduce__(self):
+        # Копия и pickle пересобирают узел конструктором, чтобы __post_init__
+        # заново вычислил _hash: __getstate__/__setstate__, созданные
+        # dataclass, восстанавливают только поля
+        return (type(self), tuple(getattr(self, field.name) for field in fields(self)))
 
-    def _str(self):
+    def __str__(self):
+        try:
+            return self._str_cache
+        except AttributeError:
+            pass
+        # Один проход с явным стеком: узлы раскладываются на фрагменты,
+        # которые склеиваются один раз. Строки поддеревьев не запоминаются,
+        # иначе память росла бы квадратично с размером выражения
+        parts = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                parts.append(item)
+                continue
+            cached = getattr(item, "_str_cache", None)
+            if cached is not None:
+                parts.append(cached)
+                continue
+            stack.extend(reversed(item._str_parts()))
+        text = "".join(parts)
+        object.__setattr__(self, "_str_cache", text)
+        return text
+
+    def _str_parts(self):
+        """Фрагменты строкового представления: строки и узлы-потомки."""
         raise NotImplementedError
 
 
+# eq=False: __eq__ и __hash__ свои, с кешированным структурным хешем
+@dataclass(frozen=True, slots=True, eq=False)
 class Variable(LogicExpression):
     """Логическая переменная."""
 
-    def __init__(self, name):
-        self.name = name
+    TAG = TAG_VAR
 
-    def simplify(self):
-        return self
+    name: str
+
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(("Variable", self.name)))
+
+    def __eq__(self, other):
+        return type(other) is Variable and self.name == other.name
 
-    def _str(self):
-        return self.name
+    # Определение __eq__ сбрасывает унаследованный __hash__
+    __hash__ = LogicExpression.__hash__
 
+    def _str_parts(self):
+        return (self.name,)
 
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Constant(LogicExpression):
     """Логическая константа (True/False)."""
 
-    def __init__(self, value):
-        self.value = value
+    TAG = TAG_CONST
+
+    value: bool
+
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(("Constant", self.value)))
+
+    def __eq__(self, other):
+        return type(other) is Constant and self.value == other.value
+
+    __hash__ = LogicExpression.__hash__
+
+    def _str_parts(self):
+        return ("True" if self.value else "False",)
 
-    def simplify(self):
-        return self
 
-    def _str(self):
-        return "True" if self.value else "False"
+# Единственные экземпляры констант, которые возвращают парсер и упрощение
+TRUE = Constant(True)
+FALSE = Constant(False)
 
 
+@dataclass(frozen=True, slots=True, eq=False)
 class Not(LogicExpression):
     """Логическое отрицание."""
 
-    def __init__(self, operand):
-        self.operand = operand
+    TAG = TAG_NOT
 
-    def simplify(self):
-        # Упрощаем операнд
-        simplified_operand = self.operand.simplify()
+    operand: LogicExpression
 
-        # Закон двойного отрицания: not(not A) = A
-        if isinstance(simplified_operand, Not):
-            return simplified_operand.operand.simplify()
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(("Not", self.operand._hash)))
 
-        # not(True) = False, not(False) = True
-        if isinstance(simplified_operand, Constant):
-            return Constant(not simplified_operand.value)
+    def __eq__(self, other):
+        return self is other or (
+            type(other) is Not and self._hash == other._hash and self.operand == other.operand
+        )
 
-        return Not(simplified_operand)
+    __hash__ = LogicExpression.__hash__
 
-    def _str(self):
-        if isinstance(self.operand, (Variable, Constant)):
-            return f"not {self.operand}"
-        return f"not ({self.operand})"
+    def _str_parts(self):
+        if _ARITY[self.operand.TAG] == 0:
+            return ("not ", self.operand)
+        return ("not (", self.operand, ")")
 
 
+@dataclass(frozen=True, slots=True, eq=False)
 class And(LogicExpression):
     """Логическое И."""
 
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    TAG = TAG_AND
 
-    def simplify(self):
-        # Упрощаем операнды
-        left = self.left.simplify()
-        right = self.right.simplify()
-
-        # A and False = False
-        if isinstance(left, Constant) and not left.value:
-            return Constant(False)
-        if isinstance(right, Constant) and not right.value:
-            return Constant(False)
-
-        # A and True = A
-        if isinstance(left, Constant) and left.value:
-            return right
-        if isinstance(right, Constant) and right.value:
-            return left
-
-        # A and A = A (идемпотентность)
-        if left.__class__ == right.__class__ and left.__dict__ == right.__dict__:
-            return left
-
-        # (A or not A) and B = B (закон исключенного третьего)
-        if self._is_excluded_middle(left):
-            return right
-        if self._is_excluded_middle(right):
-            return left
-
-        return And(left, right)
-
-    def _is_excluded_middle(self, expr):
-        """Проверяет, является ли выражение законом исключенного третьего: A or not A"""
-        if isinstance(expr, Or):
-            left_is_var = isinstance(expr.left, Variable)
-            right_is_var = isinstance(expr.right, Variable)
-            left_is_not = isinstance(expr.left, Not) and isinstance(expr.left.operand, Variable)
-            right_is_not = isinstance(expr.right, Not) and isinstance(expr.right.operand, Variable)
-
-            if left_is_var and right_is_not and expr.left.name == expr.right.operand.name:
-                return True
-            if left_is_not and right_is_var and expr.left.operand.name == expr.right.name:
-                return True
-        return False
-
-    def _str(self):
-        left_str = f"({self.left})" if isinstance(self.left, Or) else str(self.left)
-        right_str = f"({self.right})" if isinstance(self.right, Or) else str(self.right)
-        return f"{left_str} and {right_str}"
+    left: LogicExpression
+    right: LogicExpression
+
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(("And", self.left._hash, self.right._hash)))
+
+    def __eq__(self, other):
+        return self is other or (
+            type(other) is And
+            and self._hash == other._hash
+            and self.left == other.left
+            and self.right == other.right
+        )
+
+    __hash__ = LogicExpression.__hash__
 
+    def _str_parts(self):
+        left = ("(", self.left, ")") if self.left.TAG == TAG_OR else (self.left,)
+        right = ("(", self.right, ")") if self.right.TAG == TAG_OR else (self.right,)
+        return left + (" and ",) + right
 
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Or(LogicExpression):
     """Логическое ИЛИ."""
 
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    TAG = TAG_OR
 
-    def simplify(self):
-        # Упрощаем операнды
-        left = self.left.simplify()
-        right = self.right.simplify()
-
-        # A or True = True
-        if isinstance(left, Constant) and left.value:
-            return Constant(True)
-        if isinstance(right, Constant) and right.value:
-            return Constant(True)
-
-        # A or False = A
-        if isinstance(left, Constant) and not left.value:
-            return right
-        if isinstance(right, Constant) and not right.value:
-            return left
-
-        # A or A = A (идемпотентность)
-        if left.__class__ == right.__class__ and left.__dict__ == right.__dict__:
-            return left
-
-        # (A and not A) or B = B (закон противоречия)
-        if self._is_contradiction(left):
-            return right
-        if self._is_contradiction(right):
-            return left
-
-        return Or(left, right)
-
-    def _is_contradiction(self, expr):
-        """Проверяет, является ли выражение законом противоречия: A and not A"""
-        if isinstance(expr, And):
-            left_is_var = isinstance(expr.left, Variable)
-            right_is_var = isinstance(expr.right, Variable)
-            left_is_not = isinstance(expr.left, Not) and isinstance(expr.left.operand, Variable)
-            right_is_not = isinstance(expr.right, Not) and isinstance(expr.right.operand, Variable)
-
-            if left_is_var and right_is_not and expr.left.name == expr.right.operand.name:
-                return True
-            if left_is_not and right_is_var and expr.left.operand.name == expr.right.name:
-                return True
-        return False
-
-    def _str(self):
-        return f"({self.left} or {self.right})"
+    left: LogicExpression
+    right: LogicExpression
 
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash(("Or", self.left._hash, self.right._hash)))
 
-def parse_expression(expr_str):
+    def __eq__(self, other):
+        return self is other or (
+            type(other) is Or
+            and self._hash == other._hash
+            and self.left == other.left
+            and self.right == other.right
+        )
+
+    __hash__ = LogicExpression.__hash__
+
+    def _str_parts(self):
+        return ("(", self.left, " or ", self.right, ")")
+
+
+def _chain_operands(node, tag):
     """
-    Простой парсер логических выражений.
-    Поддерживает: переменные, not, and, or, скобки.
+    Возвращает операнды цепочки одноимённых операций слева направо:
+    для (A and B) and (C and D) это [A, B, C, D].
+    Узел, уже встреченный в цепочке, пропускается: повторный операнд
+    and (or) ничего не меняет (идемпотентность), а общее звено цепочки
+    иначе разворачивалось бы по разу на каждый путь к нему.
+    """
+    operands = []
+    visited = set()
+    stack = [node]
+    while stack:
+        expr = stack.pop()
+        if id(expr) in visited:
+            continue
+        visited.add(id(expr))
+        if expr.TAG == tag:
+            stack.append(expr.right)
+            stack.append(expr.left)
+        else:
+            operands.append(expr)
+    return operands
+
+
+def _simplify(root, memo):
+    """
+    Один проход правил упрощения по дереву в обратном порядке (сначала
+    операнды, затем узел) с явным стеком вместо рекурсии, поэтому глубина
+    выражения не ограничена. Цепочка and (or) обрабатывается как один
+    n-арный узел. Каждый узел упрощается не более одного раза за проход:
+    общие поддеревья берутся из memo. Ключ - id узла; узлы входного дерева
+    живы весь проход, поэтому их id не переиспользуются.
     """
-    expr_str = expr_str.replace(" ", "").replace("not", "~").replace("and", "&").replace("or", "|")
+    results = []
+    work = [(root, None)]
+    while work:
+        node, operands = work.pop()
+
+        if operands is None:
+            # Первое посещение: откладываем узел и упрощаем его операнды
+            result = memo.get(id(node))
+            if result is not None:
+                results.append(result)
+                continue
+            tag = node.TAG
+            if tag == TAG_VAR or tag == TAG_CONST:
+                results.append(node)
+                continue
+            operands = (node.operand,) if tag == TAG_NOT else _chain_operands(node, tag)
+            work.append((node, operands))
+            for operand in reversed(operands):
+                work.append((operand, None))
+            continue
+
+        # Операнды упрощены и лежат на вершине results
+        count = len(operands)
+        simplified = results[-count:]
+        del results[-count:]
+        tag = node.TAG
+        if tag == TAG_NOT:
+            result = _rewrite_not(node, simplified[0])
+        elif tag == TAG_AND:
+            # A and False = False, A and True = A, A and A = A, A and not A = False
+            result = _fold_chain(TAG_AND, simplified, FALSE, _mk_and)
+        else:
+            # A or True = True, A or False = A, A or A = A, A or not A = True
+            result = _fold_chain(TAG_OR, simplified, TRUE, _mk_or)
+        memo[id(node)] = result
+        results.append(result)
+    return results[0]
+
+
+def _rewrite_not(node, operand):
+    """Правила для not по уже упрощённому операнду."""
+    tag = operand.TAG
+
+    # Закон двойного отрицания: not(not A) = A
+    # Операнд уже упрощённого отрицания упрощён, повторный обход не нужен
+    if tag == TAG_NOT:
+        return operand.operand
+
+    # not(True) = False, not(False) = True
+    if tag == TAG_CONST:
+        return FALSE if operand.value else TRUE
+
+    if operand is node.operand:
+        return node
+    return _mk_not(operand)
+
+
+def _fold_chain(tag, simplified_operands, absorbing, make):
+    """
+    Сворачивает цепочку and (или or) по уже упрощённым операндам.
+    absorbing - поглощающая константа (FALSE для and, TRUE для or),
+    противоположная константа нейтральна. Повторные операнды отбрасываются
+    (идемпотентность), пара A и not A даёт поглощающую константу.
+    """
+    operands = []
+    seen = set()
+    for operand in simplified_operands:
+        # Упрощённый операнд сам может оказаться цепочкой той же операции
+        parts = _chain_operands(operand, tag) if operand.TAG == tag else (operand,)
+        for part in parts:
+            if part.TAG == TAG_CONST:
+                if part.value == absorbing.value:
+                    return absorbing
+                continue
+            if part in seen:
+                continue
+            seen.add(part)
+            operands.append(part)
+
+    # Законы исключённого третьего и противоречия для любого подвыражения A:
+    # благодаря хеш-консингу поиск A в seen сводится к сравнению указателей
+    for operand in operands:
+        if operand.TAG == TAG_NOT and operand.operand in seen:
+            return absorbing
+
+    if not operands:
+        return FALSE if absorbing.value else TRUE
+
+    # Собираем левоассоциативную цепочку; для неизменённой цепочки
+    # хеш-консинг вернёт исходный узел
+    result = operands[0]
+    for operand in operands[1:]:
+        result = make(result, operand)
+    return result
+
+
+# Таблица хеш-консинга: структурно равные узлы, построенные через _mk_*,
+# разделяют один объект, поэтому их равенство проверяется через `is`.
+# Ключи составных узлов содержат id() потомков: пока узел жив, он держит
+# ссылки на потомков, и их id не могут быть переиспользованы.
+_intern = weakref.WeakValueDictionary()
+
+
+def _mk_var(name):
+    key = (TAG_VAR, name)
+    node = _intern.get(key)
+    if node is None:
+        node = _intern[key] = Variable(name)
+    return node
+
+
+def _mk_not(operand):
+    key = (TAG_NOT, id(operand))
+    node = _intern.get(key)
+    if node is None:
+        node = _intern[key] = Not(operand)
+    return node
+
+
+def _mk_and(left, right):
+    key = (TAG_AND, id(left), id(right))
+    node = _intern.get(key)
+    if node is None:
+        node = _intern[key] = And(left, right)
+    return node
+
+
+def _mk_or(left, right):
+    key = (TAG_OR, id(left), id(right))
+    node = _intern.get(key)
+    if node is None:
+        node = _intern[key] = Or(left, right)
+    return node
+
+
+# Виды токенов
+_TOK_NAME = 0
+_TOK_TRUE = 1
+_TOK_FALSE = 2
+_TOK_NOT = 3
+_TOK_AND = 4
+_TOK_OR = 5
+_TOK_LPAREN = 6
+_TOK_RPAREN = 7
+
+_KEYWORD_KIND = {
+    b"True": _TOK_TRUE,
+    b"true": _TOK_TRUE,
+    b"False": _TOK_FALSE,
+    b"false": _TOK_FALSE,
+    b"not": _TOK_NOT,
+    b"and": _TOK_AND,
+    b"or": _TOK_OR,
+}
+
+# Однобайтовые токены; _NO_TOKEN - байт не образует токен
+_NO_TOKEN = 0xFF
+_PUNCT_KIND = bytearray([_NO_TOKEN]) * 256
+_PUNCT_KIND[ord("&")] = _TOK_AND
+_PUNCT_KIND[ord("|")] = _TOK_OR
+_PUNCT_KIND[ord("~")] = _TOK_NOT
+_PUNCT_KIND[ord("(")] = _TOK_LPAREN
+_PUNCT_KIND[ord(")")] = _TOK_RPAREN
+_PUNCT_KIND = bytes(_PUNCT_KIND)
+
+# Состояния ДКА токенизатора
+_ST_START = 0
+_ST_NAME = 1
+
+
+def _build_dfa():
+    """
+    Строит ДКА для идентификаторов и ключевых слов.
+    Возвращает таблицу переходов, индексируемую (состояние << 8) | байт,
+    и вид токена, который выдаётся, когда имя заканчивается в состоянии.
+    Каждому префиксу ключевого слова соответствует своё состояние, поэтому
+    ключевое слово распознаётся без срезов и сравнения строк.
+    Байты >= 0x80 относятся к имени, чтобы имена в UTF-8
+    (например, кириллица) не разрывались; небуквенные символы вне ASCII
+    parse_expression заранее заменяет пробелами.
+    """
+    name_bytes = [b for b in range(256) if 65 <= b <= 90 or 97 <= b <= 122 or b >= 0x80]
+
+    prefix_state = {b"": _ST_START}
+    for keyword in _KEYWORD_KIND:
+        for k in range(1, len(keyword) + 1):
+            if keyword[:k] not in prefix_state:
+                prefix_state[keyword[:k]] = len(prefix_state) + 1
+    n_states = len(prefix_state) + 1
+
+    # Переходы, не указанные явно, ведут в _ST_START (конец имени)
+    trans = bytearray(n_states << 8)
+    for b in name_bytes:
+        trans[(_ST_NAME << 8) | b] = _ST_NAME
+    for prefix, state in prefix_state.items():
+        for b in name_bytes:
+            trans[(state << 8) | b] = prefix_state.get(prefix + bytes([b]), _ST_NAME)
 
+    state_kind = bytearray([_TOK_NAME]) * n_states
+    for keyword, kind in _KEYWORD_KIND.items():
+        state_kind[prefix_state[keyword]] = kind
+    return bytes(trans), bytes(state_kind)
+
+
+_TRANS, _STATE_KIND = _build_dfa()
+
+
+def _tokenize(buf):
+    """
+    Разбивает байтовую строку на токены за один проход ДКА.
+    Токен - кортеж (вид, начало, конец). Пробелы и неизвестные символы
+    пропускаются.
+    """
     tokens = []
-    i = 0
-    while i < len(expr_str):
-        if expr_str[i:i+4] == "True":
-            tokens.append("True")
-            i += 4
-        elif expr_str[i:i+5] == "False":
-            tokens.append("False")
-            i += 5
-        elif expr_str[i].isalpha():
-            # Собираем полное имя переменной
-            start = i
-            while i < len(expr_str) and expr_str[i].isalpha():
-                i += 1
-            token = expr_str[start:i]
-            tokens.append(token)
-        elif expr_str[i] in "~&|()":
-            tokens.append(expr_str[i])
-            i += 1
+    append = tokens.append
+    trans = _TRANS
+    state_kind = _STATE_KIND
+    punct_kind = _PUNCT_KIND
+    state = _ST_START
+    start = 0
+    for i, b in enumerate(buf):
+        next_state = trans[(state << 8) | b]
+        if next_state != _ST_START:
+            if state == _ST_START:
+                start = i
         else:
-            i += 1
+            if state != _ST_START:
+                append((state_kind[state], start, i))
+            kind = punct_kind[b]
+            if kind != _NO_TOKEN:
+                append((kind, i, i + 1))
+        state = next_state
+    if state != _ST_START:
+        append((state_kind[state], start, len(buf)))
+    return tokens
+
+
+class _ParserState:
+    """Позиция парсера в неизменяемом кортеже токенов."""
+
+    __slots__ = ("toks", "i")
+
+    def __init__(self, toks):
+        self.toks = toks
+        self.i = 0
+
+
+def parse_expression(expr_str):
+    """
+    Простой парсер логических выражений.
+    Поддерживает: переменные, not, and, or, скобки.
+    """
+    if not expr_str.isascii():
+        # Небуквенные символы вне ASCII (неразрывный пробел, ¬ и т. п.)
+        # разделяют токены, как и прочие неизвестные символы, а не
+        # склеиваются с соседним именем
+        expr_str = "".join(ch if ch.isascii() or ch.isalpha() else " " for ch in expr_str)
+    buf = expr_str.encode()
+    p = _ParserState(tuple(_tokenize(buf)))
 
     def parse_primary():
         """Парсит первичные выражения: переменные, константы, отрицания, скобки"""
-        if not tokens:
+        if p.i >= len(p.toks):
             raise ValueError("Неправильное выражение")
 
-        token = tokens.pop(0)
-
-        if token == "True":
-            return Constant(True)
-        elif token == "False":
-            return Constant(False)
-        elif token in ["true", "false"]:
-            return Constant(token == "true")
-        elif token.isalpha():
-            return Variable(token)
-        elif token == "~":
-            return Not(parse_primary())
-        elif token == "(":
+        kind, start, end = p.toks[p.i]
+        p.i += 1
+
+        if kind == _TOK_NAME:
+            return _mk_var(buf[start:end].decode())
+        elif kind == _TOK_TRUE:
+            return TRUE
+        elif kind == _TOK_FALSE:
+            return FALSE
+        elif kind == _TOK_NOT:
+            return _mk_not(parse_primary())
+        elif kind == _TOK_LPAREN:
             expr = parse_expression_tokens()
-            if not tokens or tokens.pop(0) != ")":
+            if p.i >= len(p.toks) or p.toks[p.i][0] != _TOK_RPAREN:
                 raise ValueError("Ожидалась закрывающая скобка")
+            p.i += 1
             return expr
 
-        raise ValueError(f"Неизвестный токен: {token}")
+        raise ValueError(f"Неизвестный токен: {buf[start:end].decode()}")
 
     def parse_expression_tokens():
         """Парсит выражения с and/or"""
         left = parse_primary()
 
-        while tokens and tokens[0] in "&|":
-            op = tokens.pop(0)
+        while p.i < len(p.toks) and p.toks[p.i][0] in (_TOK_AND, _TOK_OR):
+            op = p.toks[p.i][0]
+            p.i += 1
             right = parse_primary()
 
-            if op == "&":
-                left = And(left, right)
-            elif op == "|":
-                left = Or(left, right)
+            if op == _TOK_AND:
+                left = _mk_and(left, right)
+            else:
+                left = _mk_or(left, right)
 
         return left
 
     try:
         result = parse_expression_tokens()
-        if tokens:
+        if p.i < len(p.toks):
             raise ValueError("Лишние токены в выражении")
         return result
     except Exception as e:
         raise ValueError(f"Ошибка парсинга: {e}")
 
 
-def simplify_logic_expression(expression):
+# Насыщение e-графа применяется только к небольшим выражениям:
+# число e-узлов растёт быстро из-за коммутативности и ассоциативности
+_EGRAPH_MAX_SIZE = 40
+_EGRAPH_ITER_LIMIT = 30
+_EGRAPH_NODE_LIMIT = 500
+
+# Правила для e-графа. Благодаря коммутативности достаточно одного
+# порядка операндов в каждом шаблоне.
+_EGRAPH_RULES = [
+    Rewrite("and-comm", ("and", "?a", "?b"), ("and", "?b", "?a")),
+    Rewrite("or-comm", ("or", "?a", "?b"), ("or", "?b", "?a")),
+    Rewrite("and-assoc", ("and", "?a", ("and", "?b", "?c")), ("and", ("and", "?a", "?b"), "?c")),
+    Rewrite("or-assoc", ("or", "?a", ("or", "?b", "?c")), ("or", ("or", "?a", "?b"), "?c")),
+    Rewrite("and-idem", ("and", "?a", "?a"), "?a"),
+    Rewrite("or-idem", ("or", "?a", "?a"), "?a"),
+    Rewrite("and-true", ("and", "?a", ("const", True)), "?a"),
+    Rewrite("and-false", ("and", "?a", ("const", False)), ("const", False)),
+    Rewrite("or-false", ("or", "?a", ("const", False)), "?a"),
+    Rewrite("or-true", ("or", "?a", ("const", True)), ("const", True)),
+    Rewrite("and-compl", ("and", "?a", ("not", "?a")), ("const", False)),
+    Rewrite("or-compl", ("or", "?a", ("not", "?a")), ("const", True)),
+    Rewrite("not-not", ("not", ("not", "?a")), "?a"),
+    Rewrite("not-true", ("not", ("const", True)), ("const", False)),
+    Rewrite("not-false", ("not", ("const", False)), ("const", True)),
+    Rewrite("de-morgan-and", ("not", ("and", "?a", "?b")), ("or", ("not", "?a"), ("not", "?b"))),
+    Rewrite("de-morgan-or", ("not", ("or", "?a", "?b")), ("and", ("not", "?a"), ("not", "?b"))),
+    Rewrite("de-morgan-and-rev", ("or", ("not", "?a"), ("not", "?b")), ("not", ("and", "?a", "?b"))),
+    Rewrite("de-morgan-or-rev", ("and", ("not", "?a"), ("not", "?b")), ("not", ("or", "?a", "?b"))),
+    Rewrite("and-absorb", ("and", "?a", ("or", "?a", "?b")), "?a"),
+    Rewrite("or-absorb", ("or", "?a", ("and", "?a", "?b")), "?a"),
+    Rewrite("and-absorb-not", ("and", "?a", ("or", ("not", "?a"), "?b")), ("and", "?a", "?b")),
+    Rewrite("or-absorb-not", ("or", "?a", ("and", ("not", "?a"), "?b")), ("or", "?a", "?b")),
+    Rewrite("and-factor", ("or", ("and", "?a", "?b"), ("and", "?a", "?c")), ("and", "?a", ("or", "?b", "?c"))),
+    Rewrite("or-factor", ("and", ("or", "?a", "?b"), ("or", "?a", "?c")), ("or", "?a", ("and", "?b", "?c"))),
+]
+
+# Ограничение размера BDD, по которой проверяется равносильность
+_BDD_MAX_NODES = 100000
+# Таблица истинности выражения от k переменных хранится как целое число
+# из 2**k бит: бит j равен значению выражения на наборе j, где i-я переменная
+# равна i-му биту j. Операции над узлами становятся поразрядными &, | и ^.
+# Таблица строится только для поиска минимальной ДНФ (Куайн - Мак-Класки).
+_QM_MAX_VARS = 8
+
+
+def _collect_variables(expr):
     """
-    Упрощает логическое выражение с использованием законов логики.
+    Возвращает переменные выражения в порядке первого появления
+    (по одному узлу на имя) и число различных узлов в выражении.
+    Общие поддеревья обходятся один раз.
+    """
+    variables = {}
+    visited = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        tag = node.TAG
+        if tag == TAG_VAR:
+            variables.setdefault(node.name, node)
+        elif tag == TAG_NOT:
+            stack.append(node.operand)
+        elif tag != TAG_CONST:
+            stack.append(node.right)
+            stack.append(node.left)
+    return list(variables.values()), len(visited)
+
+
+def _read_once_form(expr):
     """
+    Возвращает пару: входит ли каждая переменная в выражение один раз и
+    стоят ли все отрицания непосредственно перед переменными.
+    В интернированном дереве повторная переменная - это узел, достижимый
+    по двум путям, поэтому достаточно найти повторно встреченный узел.
+    """
+    negations_on_variables = True
+    visited = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if id(node) in visited:
+            return False, negations_on_variables
+        visited.add(id(node))
+        n_operands = _ARITY[node.TAG]
+        if n_operands == 1:
+            if node.operand.TAG != TAG_VAR:
+                negations_on_variables = False
+            stack.append(node.operand)
+        elif n_operands == 2:
+            stack.append(node.right)
+            stack.append(node.left)
+    return True, negations_on_variables
+
+
+def _column_mask(index, n_vars):
+    """Маска i-й переменной: период 2**(i+1), нижняя половина периода - нули."""
+    half = 1 << index
+    mask = ((1 << half) - 1) << half
+    width = half << 1
+    size = 1 << n_vars
+    # Удваиваем шаблон, пока он не покроет все 2**n_vars наборов
+    while width < size:
+        mask |= mask << width
+        width <<= 1
+    return mask
+
+
+def _evaluate(expr, leaf, negate, conjoin, disjoin):
+    """
+    Вычисляет выражение снизу вверх в произвольной алгебре:
+    leaf(node) даёт значение переменной или константы, negate/conjoin/disjoin
+    задают операции not/and/or. Значение каждого узла запоминается по id,
+    поэтому общие поддеревья вычисляются один раз.
+    """
+    # Операция выбирается по тегу узла из таблицы, а не цепочкой сравнений
+    operations = (leaf, leaf, negate, conjoin, disjoin)
+    arity = _ARITY
+    memo = {}
+    values = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not visited:
+            value = memo.get(id(node))
+            if value is not None:
+                values.append(value)
+                continue
+        tag = node.TAG
+        n_operands = arity[tag]
+        if n_operands == 0:
+            value = leaf(node)
+            memo[id(node)] = value
+            values.append(value)
+        elif not visited:
+            stack.append((node, True))
+            if n_operands == 1:
+                stack.append((node.operand, False))
+            else:
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+        elif n_operands == 1:
+            value = values[-1] = negate(values[-1])
+            memo[id(node)] = value
+        else:
+            right = values.pop()
+            value = values[-1] = operations[tag](values[-1], right)
+            memo[id(node)] = value
+    return values[0]
+
+
+def _truth_table(expr, columns, full):
+    """
+    Вычисляет таблицу истинности выражения как битовую маску.
+    columns - маски переменных по имени, full - маска из одних единиц.
+    """
+    def leaf(node):
+        if node.TAG == TAG_VAR:
+            return columns[node.name]
+        return full if node.value else 0
+
+    return _evaluate(
+        expr,
+        leaf,
+        lambda value: value ^ full,
+        lambda left, right: left & right,
+        lambda left, right: left | right,
+    )
+
+
+def _intern_leaf(node):
+    if node.TAG == TAG_VAR:
+        return _mk_var(node.name)
+    return TRUE if node.value else FALSE
+
+
+def _cse(expr):
+    """
+    Устранение общих подвыражений: перестраивает дерево через таблицу
+    хеш-консинга, и структурно равные поддеревья становятся одним объектом.
+    Для уже интернированного дерева возвращает его же.
+    """
+    return _evaluate(expr, _intern_leaf, _mk_not, _mk_and, _mk_or)
+
+
+def _prime_implicants(mask, n_vars):
+    """
+    Находит простые импликанты по методу Куайна - Мак-Класки.
+    Импликант - пара (значения, маска безразличных переменных).
+    Для каждой маски безразличных переменных значения импликантов хранятся
+    как битовая маска над наборами, поэтому склейка всех пар сразу
+    сводится к поразрядным операциям над целыми числами.
+    """
+    size = 1 << n_vars
+    full = (1 << size) - 1
+    zeros = [_column_mask(i, n_vars) ^ full for i in range(n_vars)]
+    # implicants[dont_care]: бит value установлен, если (value, dont_care) -
+    # импликант; биты dont_care в value нулевые
+    implicants = [0] * size
+    implicants[0] = mask
+    for dont_care in range(1, size):
+        bit = dont_care & -dont_care
+        narrower = implicants[dont_care ^ bit]
+        implicants[dont_care] = narrower & (narrower >> bit) & zeros[bit.bit_length() - 1]
+
+    primes = []
+    for dont_care, values in enumerate(implicants):
+        # Импликант прост, если его нельзя склеить ни по одной переменной
+        for i in range(n_vars):
+            bit = 1 << i
+            if values and not dont_care & bit:
+                wider = implicants[dont_care | bit]
+                values &= ~(wider | (wider << bit))
+        while values:
+            lowest = values & -values
+            primes.append((lowest.bit_length() - 1, dont_care))
+            values ^= lowest
+    return sorted(primes)
+
+
+def _sum_of_products(mask, variables):
+    """
+    Строит ДНФ по таблице истинности: сначала существенные импликанты,
+    затем жадно те, что покрывают больше всего оставшихся наборов.
+    Покрытия импликантов - битовые маски наборов.
+    """
+    n_vars = len(variables)
+    primes = _prime_implicants(mask, n_vars)
+    covers = []
+    for value, dont_care in primes:
+        cover = 1 << value
+        for i in range(n_vars):
+            bit = 1 << i
+            if dont_care & bit:
+                cover |= cover << bit
+        covers.append(cover)
+
+    # Существенные импликанты покрывают наборы, не покрытые больше никем
+    once = twice = 0
+    for cover in covers:
+        twice |= once & cover
+        once |= cover
+    unique = once & ~twice
+    chosen = [k for k, cover in enumerate(covers) if cover & unique]
+    uncovered = mask
+    for k in chosen:
+        uncovered &= ~covers[k]
+    while uncovered:
+        k = max(range(len(primes)), key=lambda k: (covers[k] & uncovered).bit_count())
+        chosen.append(k)
+        uncovered &= ~covers[k]
+
+    terms = []
+    for k in sorted(chosen):
+        value, dont_care = primes[k]
+        term = None
+        for i, variable in enumerate(variables):
+            bit = 1 << i
+            if dont_care & bit:
+                continue
+            literal = variable if value & bit else _mk_not(variable)
+            term = literal if term is None else _mk_and(term, literal)
+        terms.append(term)
+
+    result = terms[0]
+    for term in terms[1:]:
+        result = _mk_or(result, term)
+    return result
+
+
+def _from_enode_tree(tree):
+    """Строит выражение по дереву, извлечённому из e-графа."""
+    op = tree[0]
+    if op == "var":
+        return _mk_var(tree[1])
+    if op == "const":
+        return TRUE if tree[1] else FALSE
+    if op == "not":
+        return _mk_not(_from_enode_tree(tree[1]))
+    left = _from_enode_tree(tree[1])
+    right = _from_enode_tree(tree[2])
+    return _mk_and(left, right) if op == "and" else _mk_or(left, right)
+
+
+def _simplify_by_egraph(expr):
+    """
+    Ищет кратчайшую равносильную форму насыщением e-графа: правила
+    применяются во всех порядках сразу, поэтому находятся упрощения,
+    недоступные жадному переписыванию (поглощение, де Морган, вынесение
+    общего множителя). Результат принимается, только если он короче.
+    """
+    if expr.TAG == TAG_VAR or expr.TAG == TAG_CONST:
+        return expr
+    size = _collect_variables(expr)[1]
+    if size > _EGRAPH_MAX_SIZE:
+        return expr
+
+    egraph = EGraph(leaf_ops=("var", "const"))
+
+    def leaf(node):
+        if node.TAG == TAG_VAR:
+            return egraph.add(("var", node.name))
+        return egraph.add(("const", node.value))
+
+    root = _evaluate(
+        expr,
+        leaf,
+        lambda operand: egraph.add(("not", operand)),
+        lambda left, right: egraph.add(("and", left, right)),
+        lambda left, right: egraph.add(("or", left, right)),
+    )
+    saturate(egraph, _EGRAPH_RULES, iter_limit=_EGRAPH_ITER_LIMIT, node_limit=_EGRAPH_NODE_LIMIT)
+    candidate = _from_enode_tree(extract(egraph, root))
+    if _collect_variables(candidate)[1] < size:
+        return candidate
+    return expr
+
+
+def _simplify_by_bdd(expr):
+    """
+    Упрощает выражение по его канонической форме - BDD: тождественно ложное
+    и истинное выражения заменяются константами, выражение, равносильное
+    одной переменной или её отрицанию, - этим литералом. Для небольшого
+    числа переменных вместо BDD строится таблица истинности: она дешевле,
+    распознаёт те же константы и литералы и даёт минимальную ДНФ, которая
+    принимается, если она короче выражения.
+    """
+    if expr.TAG == TAG_VAR or expr.TAG == TAG_CONST:
+        return expr
+    variables, size = _collect_variables(expr)
+    n_vars = len(variables)
+    if n_vars <= _QM_MAX_VARS:
+        full = (1 << (1 << n_vars)) - 1
+        columns = {variable.name: _column_mask(i, n_vars) for i, variable in enumerate(variables)}
+        mask = _truth_table(expr, columns, full)
+        if mask == 0:
+            return FALSE
+        if mask == full:
+            return TRUE
+        for variable in variables:
+            column = columns[variable.name]
+            if mask == column:
+                return variable
+            if mask == column ^ full:
+                return _mk_not(variable)
+        candidate = _sum_of_products(mask, variables)
+        if _collect_variables(candidate)[1] < size:
+            return candidate
+        return expr
+
+    levels = {variable.name: i for i, variable in enumerate(variables)}
+
+    bdd = BDD(max_nodes=_BDD_MAX_NODES)
+
+    def leaf(node):
+        if node.TAG == TAG_VAR:
+            return bdd.variable(levels[node.name])
+        return BDD.TRUE if node.value else BDD.FALSE
+
+    try:
+        root = _evaluate(expr, leaf, bdd.negate, bdd.conjoin, bdd.disjoin)
+    except NodeLimitExceeded:
+        return expr
+
+    if root == BDD.FALSE:
+        return FALSE
+    if root == BDD.TRUE:
+        return TRUE
+    if bdd.low[root] == BDD.FALSE and bdd.high[root] == BDD.TRUE:
+        return variables[bdd.level[root]]
+    if bdd.low[root] == BDD.TRUE and bdd.high[root] == BDD.FALSE:
+        return _mk_not(variables[bdd.level[root]])
+    return expr
+
+
+def _as_expression(expression):
+    """Приводит аргумент (строку или LogicExpression) к интернированному дереву."""
     if isinstance(expression, str):
         parsed = parse_expression(expression)
         if parsed is None:
             raise ValueError(f"Не удалось распарсить выражение: {expression}")
-    elif isinstance(expression, LogicExpression):
-        parsed = expression
-    else:
-        raise TypeError("Аргумент должен быть строкой или LogicExpression")
+        return parsed
+    if isinstance(expression, LogicExpression):
+        # Парсер строит узлы через таблицу хеш-консинга, а дерево,
+        # собранное вручную, приводим к тому же виду
+        return _cse(expression)
+    raise TypeError("Аргумент должен быть строкой или LogicExpression")
+
+
+def simplify_logic_expression(expression, use_egraph=False):
+    """
+    Упрощает логическое выражение с использованием законов логики.
+    use_egraph - дополнительно искать более короткую форму насыщением
+    e-графа (де Морган, поглощение, вынесение общего множителя); это
+    на порядки медленнее остальных правил, поэтому выключено по умолчанию.
+    """
+    parsed = _as_expression(expression)
 
     # Применяем упрощение до тех пор, пока выражение не перестанет изменяться
     current = parsed
@@ -274,11 +941,73 @@ def simplify_logic_expression(expression):
     max_steps = 10  # Защита от бесконечного цикла
     while steps < max_steps:
         simplified = current.simplify()
-        if str(simplified) == str(current):
-            return simplified
+        # simplify() возвращает тот же объект, если ни одно правило не сработало
+        if simplified is current:
+            break
         current = simplified
         steps += 1
-    return current
+
+    read_once, negations_on_variables = _read_once_form(current)
+    if read_once and negations_on_variables:
+        # Каждая переменная входит один раз и со своим знаком: любая
+        # равносильная ДНФ не короче, сократить выражение может только
+        # e-граф (например, по закону де Моргана)
+        return _simplify_by_egraph(current) if use_egraph else current
+
+    # Константы, литералы и ДНФ находятся быстро, поэтому дорогое
+    # насыщение e-графа запускается, только если они ничего не дали
+    result = _simplify_by_bdd(current)
+    if use_egraph and result is current:
+        result = _simplify_by_egraph(current)
+    return result
+
+
+# Пакетное упрощение строит таблицы истинности на общих масках переменных
+_BATCH_MAX_VARS = 16
+
+
+def batch_simplify(expressions, variables=None, use_egraph=False):
+    """
+    Упрощает набор выражений над общим множеством переменных.
+    Таблицы истинности всех выражений вычисляются на одних и тех же масках
+    переменных; равносильные выражения (с одинаковой таблицей) упрощаются
+    один раз и получают один и тот же результат.
+    variables - порядок переменных; по умолчанию - порядок первого появления.
+    use_egraph передаётся в simplify_logic_expression.
+    """
+    parsed = [_as_expression(expression) for expression in expressions]
+
+    names = {}
+    for expr in parsed:
+        for variable in _collect_variables(expr)[0]:
+            names.setdefault(variable.name, variable)
+    if variables is not None:
+        unknown = [name for name in names if name not in variables]
+        if unknown:
+            raise ValueError(f"Переменные не входят в variables: {', '.join(unknown)}")
+        names = {name: _mk_var(name) for name in variables}
+
+    n_vars = len(names)
+    if n_vars > _BATCH_MAX_VARS:
+        return [simplify_logic_expression(expr, use_egraph) for expr in parsed]
+
+    full = (1 << (1 << n_vars)) - 1
+    columns = {name: _column_mask(i, n_vars) for i, name in enumerate(names)}
+
+    # Константы и литералы распознаются по маске без упрощения
+    by_mask = {0: FALSE, full: TRUE}
+    for name, variable in names.items():
+        by_mask.setdefault(columns[name], variable)
+        by_mask.setdefault(columns[name] ^ full, _mk_not(variable))
+
+    results = []
+    for expr in parsed:
+        mask = _truth_table(expr, columns, full)
+        result = by_mask.get(mask)
+        if result is None:
+            result = by_mask[mask] = simplify_logic_expression(expr, use_egraph)
+        results.append(result)
+    return results
 
 
 # Примеры использования
@@ -0,0 +1,372 @@
+import copy
+import itertools
+import pickle
+import random
+import unittest
+
+from bdd import BDD, NodeLimitExceeded
+from egraph import EGraph, extract, saturate
+from logic_simplifier import (
+    _BATCH_MAX_VARS,
+    _EGRAPH_RULES,
+    _column_mask,
+    _truth_table,
+    FALSE,
+    TRUE,
+    And,
+    Constant,
+    Not,
+    Or,
+    Variable,
+    batch_simplify,
+    parse_expression,
+    simplify_logic_expression,
+)
+
+VARIABLES = ["A", "B", "C", "D"]
+
+
+def evaluate(expr, env):
+    """Значение выражения на наборе env - прямой рекурсивный обход."""
+    if isinstance(expr, Variable):
+        return env[expr.name]
+    if isinstance(expr, Constant):
+        return expr.value
+    if isinstance(expr, Not):
+        return not evaluate(expr.operand, env)
+    if isinstance(expr, And):
+        return evaluate(expr.left, env) and evaluate(expr.right, env)
+    if isinstance(expr, Or):
+        return evaluate(expr.left, env) or evaluate(expr.right, env)
+    raise TypeError(expr)
+
+
+def truth_table(expr, names):
+    """Таблица истинности перебором всех наборов значений переменных."""
+    return [
+        evaluate(expr, dict(zip(names, values)))
+        for values in itertools.product([False, True], repeat=len(names))
+    ]
+
+
+def random_expression(rng, depth):
+    """Случайное выражение в синтаксисе парсера."""
+    r = rng.random()
+    if depth == 0 or r < 0.2:
+        if rng.random() < 0.1:
+            return rng.choice(["True", "False"])
+        return rng.choice(VARIABLES)
+    if r < 0.35:
+        return f"not ({random_expression(rng, depth - 1)})"
+    op = rng.choice(["and", "or"])
+    return f"({random_expression(rng, depth - 1)}) {op} ({random_expression(rng, depth - 1)})"
+
+
+class SimplifyTruthTableTest(unittest.TestCase):
+    def test_random_expressions_keep_truth_table(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            text = random_expression(rng, 5)
+            parsed = parse_expression(text)
+            result = simplify_logic_expression(text)
+            self.assertEqual(
+                truth_table(parsed, VARIABLES), truth_table(result, VARIABLES), text
+            )
+
+    def test_random_expressions_keep_truth_table_with_egraph(self):
+        rng = random.Random(3)
+        for _ in range(40):
+            text = random_expression(rng, 4)
+            parsed = parse_expression(text)
+            result = simplify_logic_expression(text, use_egraph=True)
+            self.assertEqual(
+                truth_table(parsed, VARIABLES), truth_table(result, VARIABLES), text
+            )
+
+    def test_egraph_is_opt_in(self):
+        text = "(A and B) or (A and C)"
+        self.assertEqual(str(simplify_logic_expression(text)), "(A and B or A and C)")
+        self.assertEqual(str(simplify_logic_expression(text, use_egraph=True)), "A and ((B or C))")
+
+    def test_readme_laws_with_egraph(self):
+        # Все законы из README через публичную функцию
+        cases = {
+            # Исключённое третье и противоречие
+            "A or not A": "True",
+            "(A or not A) and B": "B",
+            "(A and B) or not (A and B)": "True",
+            "A and not A": "False",
+            "(A and not A) or B": "B",
+            # Идемпотентность
+            "A and A": "A",
+            "A or A": "A",
+            "A and B and A": "A and B",
+            # Константы
+            "A and True": "A",
+            "A or False": "A",
+            "A and False": "False",
+            "A or True": "True",
+            # Двойное отрицание
+            "not (not A)": "A",
+            # Де Моргана
+            "not A and not B": "not ((A or B))",
+            # Поглощение
+            "A or (A and B)": "A",
+            "A and (A or B)": "A",
+            "A and (not A or B)": "A and B",
+            # Вынесение общего множителя
+            "(A and B) or (A and C)": "A and ((B or C))",
+            # Каноническая форма
+            "(A and B) or (A and not B)": "A",
+        }
+        for text, expected in cases.items():
+            self.assertEqual(str(simplify_logic_expression(text, use_egraph=True)), expected, text)
+
+    def test_readme_examples(self):
+        cases = {
+            "(A or (not A)) and B": "B",
+            "(A and (not A)) or B": "B",
+            "A and B and A": "A and B",
+            "(A and B) or not (A and B)": "True",
+            "(A and B) or (A and not B)": "A",
+            "not (not A)": "A",
+        }
+        for text, expected in cases.items():
+            self.assertEqual(str(simplify_logic_expression(text)), expected, text)
+
+    def test_shared_subtrees_are_visited_once(self):
+        # Вручную собранный DAG из 60 уровней: как дерево он экспоненциален
+        x = Variable("x")
+        expr = Variable("y")
+        for _ in range(60):
+            expr = Or(And(expr, x), Not(Or(Not(expr), x)))
+        self.assertEqual(str(simplify_logic_expression(expr)), "y")
+
+    def test_shared_chain_links_are_flattened_once(self):
+        # e = e and e, 60 раз: цепочка из 2**60 операндов как дерево
+        expr = Variable("x")
+        for _ in range(60):
+            expr = And(expr, expr)
+        self.assertEqual(str(simplify_logic_expression(expr)), "x")
+        expr = Or(expr, Variable("y"))
+        for _ in range(60):
+            expr = Or(expr, expr)
+        self.assertEqual(str(simplify_logic_expression(expr)), "(x or y)")
+
+
+class DeepExpressionTest(unittest.TestCase):
+    # Рекурсивный обход упал бы на такой глубине с RecursionError
+
+    def test_deep_not_chain(self):
+        expr = Variable("A")
+        for _ in range(100001):
+            expr = Not(expr)
+        self.assertEqual(str(simplify_logic_expression(expr)), "not A")
+
+    def test_deep_alternating_and_or_spine(self):
+        names = ["A", "B", "C", "D"]
+        expr = Variable("A")
+        for i in range(100000):
+            operand = Variable(names[i % 4]) if i % 3 else Not(Variable(names[(i + 1) % 4]))
+            expr = And(expr, operand) if i % 2 else Or(expr, operand)
+        result = simplify_logic_expression(expr)
+        # Таблицы истинности считаются итеративно, без рекурсии
+        columns = {name: _column_mask(i, len(names)) for i, name in enumerate(names)}
+        full = (1 << (1 << len(names))) - 1
+        self.assertEqual(_truth_table(result, columns, full), _truth_table(expr, columns, full))
+        self.assertEqual(str(result), "not A and C")
+
+
+class BatchSimplifyTest(unittest.TestCase):
+    def test_random_expressions_match_simplify(self):
+        rng = random.Random(4)
+        texts = [random_expression(rng, 4) for _ in range(200)]
+        for text, result in zip(texts, batch_simplify(texts)):
+            expected = simplify_logic_expression(text)
+            self.assertEqual(
+                truth_table(expected, VARIABLES), truth_table(result, VARIABLES), text
+            )
+
+    def test_constants_and_literals_from_masks(self):
+        results = batch_simplify(
+            ["A and not A", "A or not A", "A and (A or B)", "not A or (not A and B)"]
+        )
+        self.assertIs(results[0], FALSE)
+        self.assertIs(results[1], TRUE)
+        self.assertEqual([str(r) for r in results[2:]], ["A", "not A"])
+
+    def test_equivalent_expressions_share_result(self):
+        results = batch_simplify(["B or A", "A or B"])
+        self.assertIs(results[0], results[1])
+        self.assertEqual(str(results[1]), "(B or A)")
+        self.assertEqual(str(simplify_logic_expression("A or B")), "(A or B)")
+
+    def test_unknown_variable(self):
+        with self.assertRaises(ValueError):
+            batch_simplify(["A and C"], variables=["A", "B"])
+        results = batch_simplify(["A and B"], variables=["B", "A", "C"])
+        self.assertEqual(str(results[0]), "A and B")
+
+    def test_falls_back_above_variable_limit(self):
+        # Сверх _BATCH_MAX_VARS переменных выражения упрощаются по одному,
+        # без общих масок, поэтому равносильные не сливаются
+        names = ["V" + letter for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[: _BATCH_MAX_VARS + 1]]
+        chain = " and ".join(names)
+        texts = [chain + " and (X or Y)", chain + " and (Y or X)"]
+        results = batch_simplify(texts)
+        self.assertIsNot(results[0], results[1])
+        for text, result in zip(texts, results):
+            self.assertIs(result, simplify_logic_expression(text))
+
+
+class ParserTest(unittest.TestCase):
+    def test_keywords_need_word_boundaries(self):
+        self.assertEqual(str(parse_expression("band or bor")), "(band or bor)")
+        self.assertEqual(str(parse_expression("Order and TrueA")), "Order and TrueA")
+        self.assertEqual(parse_expression("notA"), Variable("notA"))
+        with self.assertRaises(ValueError):
+            parse_expression("A andB")
+
+    def test_non_ascii_letters_form_names(self):
+        self.assertEqual(str(parse_expression("Привет and Мир")), "Привет and Мир")
+        self.assertEqual(str(parse_expression("ÄB or C")), "(ÄB or C)")
+
+    def test_non_ascii_separators_are_skipped(self):
+        self.assertEqual(str(parse_expression("A\xa0and B")), "A and B")
+        self.assertEqual(str(parse_expression("A\u3000or\u2003B")), "(A or B)")
+        self.assertEqual(str(parse_expression("\xacA and B")), "A and B")
+
+
+class StrTest(unittest.TestCase):
+    def test_str_caches_only_requested_node(self):
+        names = ["".join(letters) for letters in itertools.product("ABCDEFGHIJ", repeat=4)]
+        source = " and ".join(names)
+        expr = parse_expression(source)
+        text = str(expr)
+        self.assertEqual(text, source)
+        self.assertIs(str(expr), text)
+        self.assertFalse(hasattr(expr.left, "_str_cache"))
+
+    def test_parentheses(self):
+        self.assertEqual(str(parse_expression("not (A or B) and C")), "not ((A or B)) and C")
+        self.assertEqual(str(parse_expression("(A or B) and not C")), "((A or B)) and not C")
+
+
+class NodeTest(unittest.TestCase):
+    def test_copy_and_pickle_round_trip(self):
+        expr = parse_expression("(A or not B) and True")
+        for clone in (
+            copy.copy(expr),
+            copy.deepcopy(expr),
+            pickle.loads(pickle.dumps(expr)),
+        ):
+            self.assertEqual(clone, expr)
+            self.assertEqual(hash(clone), hash(expr))
+            self.assertEqual(str(simplify_logic_expression(clone)), "(A or not B)")
+
+    def test_nodes_are_frozen(self):
+        expr = Variable("A")
+        with self.assertRaises(AttributeError):
+            expr.name = "B"
+
+
+class BDDTest(unittest.TestCase):
+    def build(self, bdd, text):
+        names = {name: i for i, name in enumerate(VARIABLES)}
+
+        def walk(expr):
+            if isinstance(expr, Variable):
+                return bdd.variable(names[expr.name])
+            if isinstance(expr, Constant):
+                return BDD.TRUE if expr.value else BDD.FALSE
+            if isinstance(expr, Not):
+                return bdd.negate(walk(expr.operand))
+            if isinstance(expr, And):
+                return bdd.conjoin(walk(expr.left), walk(expr.right))
+            return bdd.disjoin(walk(expr.left), walk(expr.right))
+
+        return walk(parse_expression(text))
+
+    def test_equivalent_functions_share_node(self):
+        bdd = BDD()
+        pairs = [
+            ("not (A and B)", "(not A) or (not B)"),
+            ("A and (B or C)", "(A and B) or (A and C)"),
+            ("(A and B) or (A and not B)", "A"),
+            ("A or not A", "True"),
+            ("A and not A", "False"),
+        ]
+        for left, right in pairs:
+            self.assertEqual(self.build(bdd, left), self.build(bdd, right), (left, right))
+
+    def test_different_functions_get_different_nodes(self):
+        bdd = BDD()
+        self.assertNotEqual(self.build(bdd, "A and B"), self.build(bdd, "A or B"))
+        self.assertNotEqual(self.build(bdd, "A"), self.build(bdd, "not A"))
+
+    def test_random_expressions_are_canonical(self):
+        # Выражения с одинаковой таблицей истинности дают один узел, и наоборот
+        rng = random.Random(2)
+        bdd = BDD()
+        nodes = {}
+        for _ in range(200):
+            text = random_expression(rng, 4)
+            table = tuple(truth_table(parse_expression(text), VARIABLES))
+            node = self.build(bdd, text)
+            self.assertEqual(nodes.setdefault(table, node), node, text)
+        self.assertEqual(len(set(nodes.values())), len(nodes))
+
+    def test_node_limit(self):
+        bdd = BDD(max_nodes=4)
+        with self.assertRaises(NodeLimitExceeded):
+            self.build(bdd, "(A and B) or (C and D)")
+
+
+class EGraphTest(unittest.TestCase):
+    def add_tree(self, egraph, tree):
+        if tree[0] in egraph.leaf_ops:
+            return egraph.add(tree)
+        return egraph.add((tree[0],) + tuple(self.add_tree(egraph, child) for child in tree[1:]))
+
+    def saturate_and_extract(self, tree):
+        egraph = EGraph(leaf_ops=("var", "const"))
+        root = self.add_tree(egraph, tree)
+        self.assertTrue(saturate(egraph, _EGRAPH_RULES, node_limit=10000))
+        return extract(egraph, root)
+
+    def test_readme_laws(self):
+        a, b, c = ("var", "A"), ("var", "B"), ("var", "C")
+        cases = [
+            # Де Моргана
+            (("and", ("not", a), ("not", b)), ("not", ("or", a, b))),
+            # Поглощение
+            (("or", a, ("and", a, b)), a),
+            (("and", a, ("or", a, b)), a),
+            (("and", a, ("or", ("not", a), b)), ("and", a, b)),
+            # Вынесение общего множителя
+            (("or", ("and", a, b), ("and", a, c)), ("and", a, ("or", b, c))),
+        ]
+        for tree, expected in cases:
+            self.assertEqual(self.saturate_and_extract(tree), expected, tree)
+
+    def test_congruence_after_union(self):
+        # После объединения A и B узлы not A и not B попадают в один класс
+        egraph = EGraph(leaf_ops=("var",))
+        a = egraph.add(("var", "A"))
+        b = egraph.add(("var", "B"))
+        not_a = egraph.add(("not", a))
+        not_b = egraph.add(("not", b))
+        self.assertNotEqual(egraph.find(not_a), egraph.find(not_b))
+        egraph.union(a, b)
+        egraph.rebuild()
+        self.assertEqual(egraph.find(not_a), egraph.find(not_b))
+
+    def test_node_limit_stops_saturation(self):
+        a, b, c = ("var", "A"), ("var", "B"), ("var", "C")
+        egraph = EGraph(leaf_ops=("var", "const"))
+        self.add_tree(egraph, ("or", ("and", a, b), ("and", a, ("not", c))))
+        self.assertFalse(saturate(egraph, _EGRAPH_RULES, node_limit=len(egraph)))
+
+
+if __name__ == "__main__":
+    unittest.main()